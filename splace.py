@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
-import asyncio
 import argparse
+import functools
+import json
 import logging
 import re
 import shutil
@@ -10,8 +11,6 @@ import os
 import sys
 import yaml
 
-from splace.read_genbank.genbank_handler import FASTA_HEADER_FIELDS
-
 __authors__     = "Renato Oliveira and Luan Rabelo"
 __license__     = "GPL-3.0"
 __version__     = "4.0.0"
@@ -30,6 +29,9 @@ logging.basicConfig(
     )
 
 
+GENBANK_EXTENSIONS = frozenset({".gb", ".gbk", ".genbank"})
+FASTA_EXTENSIONS = frozenset({".fasta", ".fa", ".fas"})
+
 DEFAULT_FASTA_HEADER_CONFIG = {
     "template": "{accession}_{family}_{genus}_{species}",
     "missing_value": "?",
@@ -52,6 +54,8 @@ def ensure_default_fasta_header_config(config_path):
 
 
 def load_fasta_header_config(config_path):
+    from splace.read_genbank.genbank_handler import FASTA_HEADER_FIELDS
+
     ensure_default_fasta_header_config(config_path)
 
     with open(config_path, "r", encoding="utf-8") as handle:
@@ -86,6 +90,69 @@ def load_fasta_header_config(config_path):
     return template, missing_value
 
 
+@functools.lru_cache(maxsize=None)
+def list_conda_env_names():
+    """Return the names of the existing Conda environments, probing Conda only once."""
+    output = subprocess.run(
+        ["conda", "env", "list", "--json"],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    env_paths = json.loads(output).get("envs", [])
+    return frozenset(os.path.basename(os.path.normpath(path)) for path in env_paths)
+
+
+def conda_env_exists(env_name):
+    """Return True if the named Conda environment exists.
+
+    Checks the active environment and the 'envs' folder of the known Conda
+    installations on disk first, and only falls back to asking Conda itself
+    (which costs a full Conda start-up) when none of them has it.
+    """
+    active_prefix = os.getenv("CONDA_PREFIX")
+    if active_prefix and os.path.basename(os.path.normpath(active_prefix)) == env_name and os.path.isdir(active_prefix):
+        return True
+
+    conda_roots = []
+    if os.getenv("CONDA_EXE"):
+        conda_roots.append(os.path.dirname(os.path.dirname(os.environ["CONDA_EXE"])))
+    for variable in ("CONDA_PREFIX_1", "CONDA_PREFIX"):
+        if os.getenv(variable):
+            conda_roots.append(os.environ[variable])
+    conda_roots.append(os.path.expanduser(os.path.join("~", ".conda")))
+
+    for conda_root in conda_roots:
+        if os.path.isdir(os.path.join(conda_root, "envs", env_name)):
+            return True
+
+    return env_name in list_conda_env_names()
+
+
+def iter_files_with_extension(root_dir):
+    """Yield (path, lowercase extension) for every file below root_dir.
+
+    Uses os.scandir directly so each entry's type comes from the directory
+    listing itself. Symlinked directories are not followed, as with os.walk.
+    """
+    stack = [root_dir]
+    while stack:
+        current_dir = stack.pop()
+        try:
+            entries = os.scandir(current_dir)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                name = entry.name
+                dot = name.rfind(".")
+                if dot >= 0 and entry.is_file():
+                    yield entry.path, name[dot:].lower()
+
+
 def collect_input_files(input_directories):
     genbank_files = set()
     fasta_files = set()
@@ -96,14 +163,11 @@ def collect_input_files(input_directories):
         if not os.path.exists(input_dir):
             raise FileNotFoundError(f"Input directory '{input_dir}' not found.")
 
-        for root, _, files in os.walk(input_dir):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                lowered = file_name.lower()
-                if lowered.endswith((".gb", ".gbk", ".genbank")):
-                    genbank_files.add(file_path)
-                elif lowered.endswith((".fasta", ".fa", ".fas")):
-                    fasta_files.add(file_path)
+        for file_path, extension in iter_files_with_extension(input_dir):
+            if extension in GENBANK_EXTENSIONS:
+                genbank_files.add(file_path)
+            elif extension in FASTA_EXTENSIONS:
+                fasta_files.add(file_path)
 
     return sorted(genbank_files), sorted(fasta_files)
 
@@ -280,6 +344,9 @@ pipeline_group.add_argument(
 )
 
 if __name__ == "__main__":
+    # Parse first so --help and usage errors return before any environment probing
+    args = parser.parse_args()
+
     print(f"\n{'#'*70}\n")
     print(f"Version:     {__version__}")
     print(f"Status:      {__status__}")
@@ -300,17 +367,12 @@ if __name__ == "__main__":
             sys.exit(1)
 
         try:
-            conda_envs = subprocess.run(
-                ["conda", "env", "list"],
-                capture_output=True,
-                text=True,
-                check=True
-            ).stdout.splitlines()
-        except subprocess.CalledProcessError:
+            tool_env_exists = conda_env_exists(tool_env)
+        except (subprocess.CalledProcessError, ValueError):
             logging.error("Failed to list Conda environments.")
             sys.exit(1)
 
-        if not any(tool_env in env for env in conda_envs):
+        if not tool_env_exists:
             logging.error(f"The '{tool_env}' conda environment does not exist. Please create it using the provided environment.yml file.")
             sys.exit(1)
 
@@ -320,8 +382,6 @@ if __name__ == "__main__":
     else:
         logging.info("Running inside a Singularity container.")
 
-    args = parser.parse_args()
-
     if not args.input_dir and not args.ncbi_search_term:
         logging.error("Provide either --input_dir or --ncbi-search-term.")
         sys.exit(1)
@@ -342,6 +402,19 @@ if __name__ == "__main__":
         logging.error("The argument --ncbi-search-term requires at least one of --ncbi-complete or --ncbi-partial.")
         sys.exit(1)
 
+    if args.trimal and not args.align:
+        logging.error("The argument --trimal requires --align to be specified.")
+        sys.exit(1)
+
+    if args.iqtree and not args.trimal:
+        logging.error("The argument --iqtree requires --trimal to be specified.")
+        sys.exit(1)
+
+    # Reject a missing input directory before any pipeline module is imported
+    if args.input_dir and not os.path.exists(args.input_dir):
+        logging.error(f"Input directory '{args.input_dir}' not found.")
+        sys.exit(1)
+
     fasta_header_template = DEFAULT_FASTA_HEADER_CONFIG["template"]
     fasta_header_missing_value = DEFAULT_FASTA_HEADER_CONFIG["missing_value"]
     if not args.download_only:
@@ -372,8 +445,8 @@ if __name__ == "__main__":
 
     # Load tool configuration
     tool_config = {
-        "mafft": {"params": "--auto", "preserve_case": True, "timeout": 3600},
-        "trimal": {"params": "-automated1", "timeout": 3600},
+        "mafft": {"params": "--auto", "preserve_case": True, "timeout": 3600, "batch_size": 1},
+        "trimal": {"params": "-automated1", "timeout": 3600, "batch_size": 1},
         "iqtree": {"bootstrap": 1000, "model": "MFP", "extra_args": ""},
     }
     if args.config:
@@ -442,16 +515,6 @@ if __name__ == "__main__":
     logging.info(msg=f"Found {len(fasta_files)} FASTA files and {len(genbank_files)} GenBank files in: {scanned_sources}")
     
     if genbank_files or fasta_files:
-        from splace import extract_multiple_genbanks
-        
-        if args.trimal and not args.align:
-            logging.error("The argument --trimal requires --align to be specified.")
-            sys.exit(1)
-        
-        if args.iqtree and not args.trimal:
-            logging.error("The argument --iqtree requires --trimal to be specified.")
-            sys.exit(1)
-
         subdirs_to_check = ["markers_fasta", "aligned_markers", "phylogeny"]
         for subdir in subdirs_to_check:
             subdir_path = os.path.join(args.output_dir, subdir)
@@ -466,9 +529,13 @@ if __name__ == "__main__":
 
         logging.info(msg=f"Found {len(genbank_files)} GenBank files and {len(fasta_files)} FASTA files. Processing...")
         try:
+            import asyncio
+
             converted_files = set()
             
             if genbank_files:
+                from splace import extract_multiple_genbanks
+
                 benchmark.start("GenBank Extraction")
                 gb_results = asyncio.run(
                     extract_multiple_genbanks(
@@ -519,7 +586,8 @@ if __name__ == "__main__":
                         threads=args.threads,
                         mafft_params=tool_config["mafft"]["params"],
                         preserve_case=tool_config["mafft"]["preserve_case"],
-                        timeout=tool_config["mafft"]["timeout"]
+                        timeout=tool_config["mafft"]["timeout"],
+                        batch_size=tool_config["mafft"]["batch_size"]
                     )
                 )
                 benchmark.stop("Alignment")
@@ -535,7 +603,8 @@ if __name__ == "__main__":
                             output_dir=os.path.join(args.output_dir, "trimmed_markers"),
                             trimal_params=tool_config["trimal"]["params"],
                             max_concurrent=args.threads,
-                            timeout=tool_config["trimal"]["timeout"]
+                            timeout=tool_config["trimal"]["timeout"],
+                            batch_size=tool_config["trimal"]["batch_size"]
                         )
                     )
                     benchmark.stop("Trimming")
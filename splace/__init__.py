@@ -1,10 +1,31 @@
-from .alignment.run_mafft_alignment import align_multiple_files
-from .ncbi_download import build_ncbi_search_term
-from .ncbi_download import download_genbank_records_from_search
-from .ncbi_download import fetch_ncbi_summaries
-from .ncbi_download import find_api_settings
-from .ncbi_download import search_ncbi_genome_ids
-from .read_genbank.genbank_handler import extract_multiple_genbanks
-from .read_fasta.fasta_handler import extract_multiple_fastas
-from .trimming.run_trimal import trim_multiple_files
-from .phylogeny.run_iqtree import run_phylogeny_pipeline
\ No newline at end of file
+import importlib
+
+# Public pipeline entry points, resolved on first access so that importing
+# one stage does not pull in the dependencies of every other stage.
+_EXPORTS = {
+    "align_multiple_files": ".alignment.run_mafft_alignment",
+    "build_ncbi_search_term": ".ncbi_download",
+    "download_genbank_records_from_search": ".ncbi_download",
+    "fetch_ncbi_summaries": ".ncbi_download",
+    "find_api_settings": ".ncbi_download",
+    "search_ncbi_genome_ids": ".ncbi_download",
+    "extract_multiple_genbanks": ".read_genbank.genbank_handler",
+    "extract_multiple_fastas": ".read_fasta.fasta_handler",
+    "trim_multiple_files": ".trimming.run_trimal",
+    "run_phylogeny_pipeline": ".phylogeny.run_iqtree",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
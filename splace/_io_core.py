@@ -0,0 +1,83 @@
+import functools
+import os
+import tempfile
+from collections import defaultdict
+
+from SynGenes import SynGenes
+
+# Workaround: SynGenes 1.0.6 builds log path without separator and may
+# write to a read-only filesystem inside containers. Redirect to temp dir.
+# This must happen before the instance is built: SynGenes() downloads its
+# database under cwd_path, and fix_gene_name later reads it from there.
+SynGenes.cwd_path = tempfile.gettempdir() + os.sep
+sg = SynGenes(verbose=False)
+
+DEFAULT_GENES = {
+    "mt": ("COI", "COII", "COIII", "CYTB", "ND1", "ND2", "ND3", "ND4", "ND4L", "ND5", "ND6", "ATP6", "ATP8"),
+    "cp": ("rbcL", "matK", "ndhF", "atpB", "psaA", "psbA", "psbB", "psbC", "psbD", "psbE", "psbF", "psbH", "psbI", "psbJ", "psbK", "psbL", "psbM", "psbN", "psbT"),
+}
+
+
+def target_genes(data_type, genes_filter=None):
+    """Return the set of gene names to extract, or None to extract everything.
+
+    An explicit genes_filter wins; otherwise the default markers for "mt" or "cp".
+    """
+    genes = genes_filter or DEFAULT_GENES.get(data_type)
+    return frozenset(genes) if genes else None
+
+
+@functools.lru_cache(maxsize=8192)
+def fix_gene_name(raw, data_type):
+    """Memoized SynGenes lookup; the same gene/product strings recur across records and files."""
+    return sg.fix_gene_name(geneName=raw, type=data_type)
+
+
+def resolve_gene_name(raw, data_type, genes_set=None):
+    """Normalize raw with SynGenes and return it if it is one of genes_set (or there is no filter), else None."""
+    normalized = fix_gene_name(raw, data_type)
+    if normalized and (genes_set is None or normalized in genes_set):
+        return normalized
+    return None
+
+
+class BufferedGeneWriter:
+    """
+    ## Collect FASTA records per gene and append each gene file once
+
+    Records are kept in memory as bytes and written on a clean exit from the
+    `with` block, one write per gene file, so concurrent writers never
+    interleave inside a record. Nothing is written if the block raises.
+
+    - Args:
+        - `output_dir` (**str**): Directory holding the gene files
+        - `file_suffix` (**str**): Appended to the gene name to form the file name (default: ".fasta")
+    """
+
+    def __init__(self, output_dir, file_suffix=".fasta"):
+        self.output_dir = output_dir
+        self.file_suffix = file_suffix
+        self.buffers = defaultdict(list)
+        self.written_files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def append(self, gene_name, header_line, sequence):
+        """Queue one record; header_line is the encoded ">...\\n" line, sequence the residues as bytes."""
+        self.buffers[gene_name] += (header_line, sequence, b"\n")
+
+    def flush(self):
+        """Append the queued records to their gene files and return the paths written."""
+        for gene_name, chunks in self.buffers.items():
+            output_file_path = os.path.join(self.output_dir, f"{gene_name}{self.file_suffix}")
+            with open(output_file_path, "ab") as output_file:
+                output_file.write(b"".join(chunks))
+            self.written_files.append(output_file_path)
+        self.buffers.clear()
+        return self.written_files
@@ -1,9 +1,25 @@
 import asyncio
 import logging
 import os
+import shlex
 import shutil
+import signal
 import sys
 
+from splace.utils import gather_bounded
+
+def _build_mafft_command(mafft_params, mafft_threads, preserve_case):
+    """Return the MAFFT argument list, without the input file."""
+    cmd = ["mafft", "--thread", str(mafft_threads)]
+
+    if mafft_params:
+        cmd.extend(mafft_params.split())
+    
+    if preserve_case:
+        cmd.append("--preservecase")
+
+    return cmd
+
 async def mafft_alignment(**kwargs):
     """
     ## Run MAFFT alignment on a single FASTA file
@@ -42,44 +58,41 @@ async def mafft_alignment(**kwargs):
         base_name = os.path.splitext(input_fasta_file)[0]
         aligned_fasta_output = f"{base_name}_aligned.fasta"
     
-    cmd = ["mafft", "--thread", str(mafft_threads)]
-
-    if mafft_params:
-        cmd.extend(mafft_params.split())
-    
-    if preserve_case:
-        cmd.append("--preservecase")
-    
+    cmd = _build_mafft_command(mafft_params, mafft_threads, preserve_case)
     cmd.append(input_fasta_file)
 
     try:
         logging.info(f"Starting MAFFT alignment for {os.path.basename(input_fasta_file)}, please wait...")
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        try:
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=mafft_timeout
+        # MAFFT writes the alignment straight into the output file; only
+        # stderr is piped back for error reporting.
+        with open(aligned_fasta_output, 'wb') as out_f:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=out_f,
+                stderr=asyncio.subprocess.PIPE
             )
-        except asyncio.TimeoutError:
-            process.kill()
-            await process.wait()
-            logging.error(f"MAFFT alignment timed out for {os.path.basename(input_fasta_file)}")
-            sys.exit(1)
+            
+            try:
+                _, stderr = await asyncio.wait_for(
+                    process.communicate(),
+                    timeout=mafft_timeout
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                out_f.close()
+                os.unlink(aligned_fasta_output)
+                logging.error(f"MAFFT alignment timed out for {os.path.basename(input_fasta_file)}")
+                sys.exit(1)
         
         if process.returncode == 0:
-            with open(aligned_fasta_output, 'w', encoding='utf-8') as f:
-                f.write(stdout.decode('utf-8'))
             logging.info(f"Alignment completed for {os.path.basename(aligned_fasta_output)}")
             
             return aligned_fasta_output
         
         else:
+            os.unlink(aligned_fasta_output)
             error_msg = stderr.decode('utf-8')
             logging.error(f"MAFFT error for {os.path.basename(input_fasta_file)}: {error_msg}")
             sys.exit(1)
@@ -91,6 +104,97 @@ async def mafft_alignment(**kwargs):
         logging.error(f"Error running MAFFT for {os.path.basename(input_fasta_file)}: {e}")
         sys.exit(1)
 
+async def mafft_batch_alignment(**kwargs):
+    """
+    ## Run MAFFT on several FASTA files inside a single shell process
+    
+    Saves one Python-side process launch per file when aligning many small
+    markers. Requires a POSIX shell.
+    
+    - Args:
+        - `fasta_files` (**List[str]**): Input FASTA file paths
+        - `output_files` (**List[str]**): Output aligned FASTA file paths, one per input
+        - `mafft_params` (**str**): MAFFT parameters
+        - `threads` (**int**): Number of threads
+        - `preserve_case` (**bool**): Preserve case (default: True)
+        - `timeout` (**int**): Timeout in seconds per alignment (default: 3600)
+    
+    - Returns:
+        **List[str]**: Paths to output files if successful, sys.exit(1) otherwise
+    """
+    input_fasta_files = kwargs.get("fasta_files", [])
+    aligned_fasta_outputs = kwargs.get("output_files", [])
+    mafft_params = kwargs.get("mafft_params", None)
+    mafft_threads = kwargs.get("threads", 4)
+    preserve_case = kwargs.get("preserve_case", True)
+    mafft_timeout = kwargs.get("timeout", 3600)
+
+    if shutil.which("mafft") is None:
+        logging.error("MAFFT is not installed or not found in PATH. Please install MAFFT and try again.")
+        sys.exit(1)
+
+    for input_fasta_file in input_fasta_files:
+        if not os.path.isfile(input_fasta_file):
+            logging.error(f"Input FASTA file ({os.path.abspath(input_fasta_file)}) not found. Please check the path and try again.")
+            sys.exit(1)
+
+    # A failing alignment prints its position on stdout and stops the script,
+    # so the failing file can be reported whatever the batch size.
+    base_cmd = _build_mafft_command(mafft_params, mafft_threads, preserve_case)
+    script = "\n".join(
+        f"{shlex.join(base_cmd + [input_fasta_file])} > {shlex.quote(aligned_fasta_output)} || {{ echo {position}; exit 1; }}"
+        for position, (input_fasta_file, aligned_fasta_output) in enumerate(zip(input_fasta_files, aligned_fasta_outputs))
+    )
+    batch_names = ", ".join(os.path.basename(f) for f in input_fasta_files)
+
+    try:
+        logging.info(f"Starting MAFFT batch alignment for {batch_names}, please wait...")
+
+        # Own process group, so a timeout can kill MAFFT and not just the shell
+        process = await asyncio.create_subprocess_shell(
+            script,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout=mafft_timeout * len(input_fasta_files)
+            )
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            for aligned_fasta_output in aligned_fasta_outputs:
+                if os.path.exists(aligned_fasta_output):
+                    os.unlink(aligned_fasta_output)
+            logging.error(f"MAFFT batch alignment timed out for {batch_names}")
+            sys.exit(1)
+
+        if process.returncode == 0:
+            for aligned_fasta_output in aligned_fasta_outputs:
+                logging.info(f"Alignment completed for {os.path.basename(aligned_fasta_output)}")
+            return list(aligned_fasta_outputs)
+
+        reported = stdout.split()
+        failed = int(reported[0]) if reported else -1
+        if 0 <= failed < len(input_fasta_files):
+            if os.path.exists(aligned_fasta_outputs[failed]):
+                os.unlink(aligned_fasta_outputs[failed])
+            failed_name = os.path.basename(input_fasta_files[failed])
+        else:
+            failed_name = batch_names
+        logging.error(f"MAFFT error for {failed_name}: {stderr.decode('utf-8')}")
+        sys.exit(1)
+
+    except Exception as e:
+        logging.error(f"Error running MAFFT batch for {batch_names}: {e}")
+        sys.exit(1)
+
 async def align_multiple_files(**kwargs):
     """
     ## Align multiple FASTA files using MAFFT with concurrency control
@@ -103,6 +207,7 @@ async def align_multiple_files(**kwargs):
         - `threads` (**int**): Number of threads per alignment
         - `preserve_case` (**bool**): Preserve case
         - `timeout` (**int**): Timeout per alignment
+        - `batch_size` (**int**): Files aligned per MAFFT shell process (default: 1, one process per file)
 
     - Returns:
         **List[str]**: List of successfully aligned file paths
@@ -114,6 +219,7 @@ async def align_multiple_files(**kwargs):
     mafft_threads = kwargs.get("threads", 4)
     preserve_case = kwargs.get("preserve_case", True)
     mafft_timeout = kwargs.get("timeout", 3600)
+    batch_size = kwargs.get("batch_size", 1)
     
     if not list_fasta_files or len(list_fasta_files) == 0:
         logging.warning("No FASTA files provided for alignment")
@@ -123,34 +229,54 @@ async def align_multiple_files(**kwargs):
         logging.info(f"Creating output directory: {aligned_output_directory}")
         os.makedirs(aligned_output_directory, exist_ok=True, mode=0o755)
     
-    semaphore = asyncio.Semaphore(max_concurrent_alignments)
+    if batch_size > 1 and os.name == "nt":
+        logging.warning("MAFFT batch mode requires a POSIX shell. Aligning files individually.")
+        batch_size = 1
+    batch_size = max(1, batch_size)
+    batches = [list_fasta_files[i:i + batch_size] for i in range(0, len(list_fasta_files), batch_size)]
     
-    async def align_single_file(**kwargs):
-        """Align a single file with semaphore control"""
-        fasta_file = kwargs.get('fasta_file')
-        async with semaphore:
-            base_name = os.path.splitext(os.path.basename(fasta_file))[0]
-            output_file = os.path.join(aligned_output_directory, f"{base_name}_aligned.fasta")
-            
-            return await mafft_alignment(
-                fasta_file=fasta_file,
-                output_file=output_file,
+    # Keep concurrent alignments x MAFFT threads within the available cores
+    cpu_count = os.cpu_count() or 1
+    max_concurrent_alignments = max(1, min(max_concurrent_alignments, len(batches)))
+    adjusted_threads = max(1, cpu_count // max_concurrent_alignments)
+    if max_concurrent_alignments * mafft_threads > cpu_count and adjusted_threads < mafft_threads:
+        logging.info(f"Reducing MAFFT threads per alignment from {mafft_threads} to {adjusted_threads} ({max_concurrent_alignments} concurrent alignments on {cpu_count} CPUs)")
+        mafft_threads = adjusted_threads
+    
+    def aligned_output_path(fasta_file):
+        base_name = os.path.splitext(os.path.basename(fasta_file))[0]
+        return os.path.join(aligned_output_directory, f"{base_name}_aligned.fasta")
+    
+    async def align_batch(batch):
+        """Align a batch of files"""
+        if len(batch) == 1:
+            return [await mafft_alignment(
+                fasta_file=batch[0],
+                output_file=aligned_output_path(batch[0]),
                 mafft_params=mafft_params,
                 threads=mafft_threads,
                 preserve_case=preserve_case,
                 timeout=mafft_timeout
-            )
+            )]
+        
+        return await mafft_batch_alignment(
+            fasta_files=batch,
+            output_files=[aligned_output_path(f) for f in batch],
+            mafft_params=mafft_params,
+            threads=mafft_threads,
+            preserve_case=preserve_case,
+            timeout=mafft_timeout
+        )
     
-    tasks = [align_single_file(fasta_file=fasta_file) for fasta_file in list_fasta_files]
     logging.info(f"Starting alignment of {len(list_fasta_files)} files with {max_concurrent_alignments} concurrent processes")
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await gather_bounded(batches, align_batch, max_concurrent_alignments)
     
     aligned_files = []
-    for i, result in enumerate(results):
+    for batch, result in zip(batches, results):
         if isinstance(result, Exception):
-            logging.error(f"Error aligning {list_fasta_files[i]}: {result}")
-        elif result is not None:
-            aligned_files.append(result)
+            logging.error(f"Error aligning {', '.join(batch)}: {result}")
+        else:
+            aligned_files.extend(r for r in result if r is not None)
     
     logging.info(f"Alignments completed: {len(aligned_files)}/{len(list_fasta_files)} successful")
     
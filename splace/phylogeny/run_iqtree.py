@@ -1,17 +1,37 @@
+import functools
 import logging
 import os
 import re
 import shutil
+import sqlite3
 import subprocess
-from Bio import SeqIO
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 
+IQTREE_BEST_THREADS_RE = re.compile(r"BEST NUMBER OF THREADS:\s*(\d+)")
+IQTREE_LOG_TAIL_LINES = 50
+
+# Write buffer for the NEXUS supermatrix; rows are flushed in large blocks
+SUPERMATRIX_BUFFER_SIZE = 4 * 1024 * 1024
+
+# Most buffers passed to a single os.writev call (bounded by IOV_MAX)
+try:
+    WRITEV_MAX_SEGMENTS = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    WRITEV_MAX_SEGMENTS = 1024
+if WRITEV_MAX_SEGMENTS <= 0:
+    WRITEV_MAX_SEGMENTS = 1024
+
+@functools.lru_cache(maxsize=None)
 def check_iqtree():
-    """Check if IQ-TREE is installed (iqtree or iqtree2)."""
+    """Check if IQ-TREE is installed (iqtree or iqtree2). The lookup is cached."""
     if shutil.which("iqtree2"):
         return "iqtree2"
     elif shutil.which("iqtree"):
@@ -161,50 +181,141 @@ def _build_presence_report(all_taxa, gene_data, output_dir):
     plt.close(fig)
     logging.info(f"Gene presence heatmap saved to: {heatmap_path}")
 
-def prepare_supermatrix(trimmed_files, output_dir, allow_missing=False, report_dir=None):
+def _writev_all(fd, segments):
+    """Write all byte segments to fd with gather writes, resuming after partial writes."""
+    start = 0
+    while start < len(segments):
+        written = os.writev(fd, segments[start:start + WRITEV_MAX_SEGMENTS])
+        while start < len(segments) and written >= len(segments[start]):
+            written -= len(segments[start])
+            start += 1
+        if written:
+            segments[start] = memoryview(segments[start])[written:]
+
+def _parse_gene(fasta_path):
+    """Read one trimmed alignment into (gene_name, length, {taxon: sequence bytes}), or None if unusable."""
+    gene_name = os.path.basename(fasta_path).replace("_aligned_trimmed.fasta", "").replace("_trimmed.fasta", "").replace(".fasta", "")
+
+    records = {}
+    length = 0
+    try:
+        with open(fasta_path, "r", encoding="utf-8") as handle:
+            for title, seq in SimpleFastaParser(handle):
+                if length == 0:
+                    length = len(seq)
+                elif len(seq) != length:
+                    logging.warning(f"Sequence length mismatch in {gene_name}. Expected {length}, got {len(seq)} for {title}")
+
+                records[title] = seq.encode("ascii")
+
+    except Exception as e:
+        logging.error(f"Error reading {fasta_path}: {e}")
+        return None
+
+    if length == 0:
+        logging.warning(f"Gene {gene_name} is empty or invalid. Skipping.")
+        return None
+
+    return gene_name, length, records
+
+def _spill_genes(trimmed_files, store, threads):
+    """
+    Parse trimmed alignments and move their sequences into the SQLite store.
+
+    Only `threads` genes are held in memory at a time; everything kept
+    afterwards is taxon labels and per-gene lengths.
+
+    Returns:
+        tuple: (gene_data, taxon_ids) where gene_data is a list of
+        (gene_name, length, taxa) tuples and taxon_ids maps each taxon
+        label to its integer key in the store.
+    """
+    store.execute("CREATE TABLE sequences (taxon_id INTEGER, gene_id INTEGER, seq BLOB, PRIMARY KEY (taxon_id, gene_id)) WITHOUT ROWID")
+
+    gene_data = []
+    taxon_ids = {}
+    workers = max(1, threads)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(trimmed_files), workers):
+            for gene in executor.map(_parse_gene, trimmed_files[start:start + workers]):
+                if gene is None:
+                    continue
+                gene_name, length, records = gene
+                gene_id = len(gene_data)
+                store.executemany(
+                    "INSERT INTO sequences VALUES (?, ?, ?)",
+                    ((taxon_ids.setdefault(taxon, len(taxon_ids)), gene_id, seq) for taxon, seq in records.items())
+                )
+                gene_data.append((gene_name, length, frozenset(records)))
+    store.commit()
+
+    return gene_data, taxon_ids
+
+def prepare_supermatrix(trimmed_files, output_dir, allow_missing=False, report_dir=None, threads=1):
     """
     Concatenate trimmed alignments into a supermatrix (NEXUS format) with partition block.
 
+    Sequences are spilled to a temporary SQLite file while the inputs are
+    read and streamed back one taxon row at a time, so memory use does not
+    grow with the size of the supermatrix. The file holds a full copy of the
+    matrix, lives in the system temp directory (set TMPDIR to move it) and
+    is removed once the supermatrix is written.
+
     Args:
         trimmed_files (list): List of paths to trimmed FASTA files.
         output_dir (str): Directory to save the supermatrix.
         allow_missing (bool): If True, fill missing genes with '?' characters.
             If False, remove genes that are not present in all taxa.
+        threads (int): Number of trimmed files to read concurrently.
 
     Returns:
         str: Path to the generated supermatrix file.
     """
+    try:
+        store_fd, store_path = tempfile.mkstemp(prefix="splace_supermatrix_", suffix=".sqlite")
+        os.close(store_fd)
+    except OSError as e:
+        logging.error(f"Failed to create supermatrix: {e}")
+        return None
+
+    store = None
+    try:
+        store = sqlite3.connect(store_path)
+        store.execute("PRAGMA journal_mode=OFF")
+        store.execute("PRAGMA synchronous=OFF")
+        return _build_supermatrix(store, trimmed_files, output_dir, allow_missing, report_dir, threads)
+    except (OSError, sqlite3.Error) as e:
+        logging.error(f"Failed to create supermatrix: {e}")
+        return None
+    finally:
+        if store is not None:
+            store.close()
+        os.remove(store_path)
+
+def _build_supermatrix(store, trimmed_files, output_dir, allow_missing, report_dir, threads):
+    """Body of prepare_supermatrix, using `store` as the on-disk sequence table."""
     logging.info("Preparing supermatrix...")
 
     # Sort files to ensure deterministic order
     trimmed_files.sort()
 
     all_taxa = set()
-    gene_data = [] # List of tuples: (gene_name, length, sequence_dict)
-
-    # 1. Read all files
-    for fasta_path in trimmed_files:
-        gene_name = os.path.basename(fasta_path).replace("_aligned_trimmed.fasta", "").replace("_trimmed.fasta", "").replace(".fasta", "")
 
-        records = {}
-        length = 0
-        try:
-            for record in SeqIO.parse(fasta_path, "fasta"):
-                if length == 0:
-                    length = len(record.seq)
-                elif len(record.seq) != length:
-                    logging.warning(f"Sequence length mismatch in {gene_name}. Expected {length}, got {len(record.seq)} for {record.description}")
-
-                records[record.description] = str(record.seq)
-                all_taxa.add(record.description)
-
-            if length > 0:
-                gene_data.append((gene_name, length, records))
-            else:
-                logging.warning(f"Gene {gene_name} is empty or invalid. Skipping.")
+    # 1. Read all files (independent per gene, so parse them concurrently)
+    try:
+        gene_data, taxon_ids = _spill_genes(trimmed_files, store, threads)
+    except sqlite3.Error as e:
+        logging.error(f"Failed to store sequences for the supermatrix: {e}")
+        return None
 
-        except Exception as e:
-            logging.error(f"Error reading {fasta_path}: {e}")
+    # Collect taxa, total sites and the widest taxon label in the same pass
+    total_chars = 0
+    max_name_len = 0
+    for _, length, taxa in gene_data:
+        all_taxa.update(taxa)
+        total_chars += length
+        max_name_len = max(max_name_len, max(map(len, taxa)))
+    max_name_len += 2
 
     if not gene_data:
         logging.error("No valid data found to create supermatrix.")
@@ -213,15 +324,21 @@ def prepare_supermatrix(trimmed_files, output_dir, allow_missing=False, report_d
     # Report gene presence/absence matrix
     _build_presence_report(all_taxa, gene_data, report_dir or output_dir)
 
+    # Store keys of the genes that make it into the matrix, in output order
+    gene_ids = list(range(len(gene_data)))
+
     # 2. Filter genes based on allow_missing
     if not allow_missing:
         complete_genes = []
-        for gene_name, length, records in gene_data:
-            missing_taxa = all_taxa - set(records.keys())
+        complete_ids = []
+        for gene_id, (gene_name, length, taxa) in zip(gene_ids, gene_data):
+            missing_taxa = all_taxa - taxa
             if missing_taxa:
                 logging.info(f"Removing gene '{gene_name}': missing from {len(missing_taxa)} taxa ({', '.join(sorted(missing_taxa)[:3])}{'...' if len(missing_taxa) > 3 else ''})")
+                total_chars -= length
             else:
-                complete_genes.append((gene_name, length, records))
+                complete_genes.append((gene_name, length, taxa))
+                complete_ids.append(gene_id)
 
         if not complete_genes:
             logging.error("No genes are present in all taxa. Use --allow-missing to include partial data.")
@@ -231,53 +348,85 @@ def prepare_supermatrix(trimmed_files, output_dir, allow_missing=False, report_d
         if removed_count > 0:
             logging.info(f"Kept {len(complete_genes)}/{len(gene_data)} genes (removed {removed_count} incomplete genes)")
         gene_data = complete_genes
+        gene_ids = complete_ids
 
     # 3. Build Supermatrix
+    # Columns are written as-is, not collapsed into weighted site patterns:
+    # IQ-TREE already compresses identical patterns per partition on load,
+    # and it does not read NEXUS WTSET weights, so a deduplicated matrix
+    # would change the per-partition site counts, model selection and the
+    # bootstrap resampling.
     output_nexus = os.path.join(output_dir, "supermatrix.nex")
-    total_chars = sum(g[1] for g in gene_data)
     num_taxa = len(all_taxa)
 
     # When genes were filtered, some taxa may no longer have any data
     # Recompute actual taxa from remaining genes
     if not allow_missing:
         actual_taxa = set()
-        for _, _, records in gene_data:
-            actual_taxa.update(records.keys())
+        for _, _, taxa in gene_data:
+            actual_taxa.update(taxa)
         all_taxa = actual_taxa
         num_taxa = len(all_taxa)
 
     try:
-        with open(output_nexus, "w", encoding="utf-8") as out:
-            out.write("#NEXUS\n")
-            out.write("BEGIN DATA;\n")
-            out.write(f"DIMENSIONS NTAX={num_taxa} NCHAR={total_chars};\n")
-            out.write("FORMAT DATATYPE=DNA GAP=- MISSING=?;\n")
-            out.write("MATRIX\n")
+        with open(output_nexus, "wb", buffering=SUPERMATRIX_BUFFER_SIZE) as out:
+            out.write(b"#NEXUS\n")
+            out.write(b"BEGIN DATA;\n")
+            out.write(f"DIMENSIONS NTAX={num_taxa} NCHAR={total_chars};\n".encode("ascii"))
+            out.write(b"FORMAT DATATYPE=DNA GAP=- MISSING=?;\n")
+            out.write(b"MATRIX\n")
 
             sorted_taxa = sorted(list(all_taxa))
-            max_name_len = max(len(t) for t in sorted_taxa) + 2
 
-            missing_char = "?" if allow_missing else "-"
+            # Position of each stored gene within a row; filtered genes are absent
+            gene_slots = {gene_id: slot for slot, gene_id in enumerate(gene_ids)}
+
+            # One shared fill block per gene, reused for every taxon missing it
+            missing_char = b"?" if allow_missing else b"-"
+            gap_cache = [missing_char * length for _, length, _ in gene_data]
+
+            # Rows are emitted as lists of existing bytes segments. On POSIX
+            # they are gathered straight from those buffers with os.writev,
+            # many rows per syscall; elsewhere each row is joined and written.
+            use_writev = hasattr(os, "writev")
+            if use_writev:
+                out.flush()
+            segments = []
+            row_segments = len(gene_data) + 2
 
             for taxon in sorted_taxa:
                 safe_taxon_name = f"'{taxon}'"
-                out.write(f"{safe_taxon_name.ljust(max_name_len)} ")
+                segments.append(f"{safe_taxon_name.ljust(max_name_len)} ".encode("utf-8"))
 
-                for _, length, records in gene_data:
-                    seq = records.get(taxon, missing_char * length)
-                    out.write(seq)
-                out.write("\n")
+                # Only this taxon's sequences are loaded from the store
+                row = list(gap_cache)
+                for gene_id, seq in store.execute("SELECT gene_id, seq FROM sequences WHERE taxon_id = ?", (taxon_ids[taxon],)):
+                    slot = gene_slots.get(gene_id)
+                    if slot is not None:
+                        row[slot] = seq
+                segments.extend(row)
+                segments.append(b"\n")
 
-            out.write(";\nEND;\n\n")
+                if not use_writev:
+                    out.write(b"".join(segments))
+                    segments.clear()
+                elif len(segments) + row_segments > WRITEV_MAX_SEGMENTS:
+                    _writev_all(out.fileno(), segments)
+                    segments.clear()
+
+            if segments:
+                _writev_all(out.fileno(), segments)
+
+            out.write(b";\nEND;\n\n")
 
             # 4. Write Partition Block (Sets)
-            out.write("BEGIN SETS;\n")
+            out.write(b"BEGIN SETS;\n")
             current_pos = 1
             for gene_name, length, _ in gene_data:
                 end_pos = current_pos + length - 1
-                out.write(f"    CHARSET {gene_name} = {current_pos}-{end_pos};\n")
+                out.write(f"    CHARSET {gene_name} = {current_pos}-{end_pos};\n".encode("utf-8"))
                 current_pos = end_pos + 1
-            out.write("END;\n")
+            out.write(b"END;\n")
 
         logging.info(f"Supermatrix created at {output_nexus} (Taxa: {num_taxa}, Sites: {total_chars}, Genes: {len(gene_data)}, Missing data: {'allowed' if allow_missing else 'not allowed'})")
         return output_nexus
@@ -286,38 +435,40 @@ def prepare_supermatrix(trimmed_files, output_dir, allow_missing=False, report_d
         logging.error(f"Failed to create supermatrix: {e}")
         return None
 
-def run_iqtree_analysis(supermatrix_path, output_dir, threads=1, bootstrap=1000, model="MFP", extra_args=""):
+def run_iqtree_analysis(supermatrix_path, output_dir, threads=1, bootstrap=1000, model="MFP", extra_args="", iqtree_cmd=None):
     """
     Run IQ-TREE analysis on the supermatrix.
 
     Args:
         supermatrix_path (str): Path to the supermatrix file.
         output_dir (str): Directory for output files.
-        threads (int): Number of threads.
+        threads (int): Upper bound on threads; IQ-TREE picks the count via -nt AUTO.
         bootstrap (int): Number of ultrafast bootstrap replicates.
         model (str): Substitution model (e.g., "MFP" for ModelFinder).
         extra_args (str): Additional IQ-TREE arguments.
+        iqtree_cmd (str): IQ-TREE executable to use. Looked up with check_iqtree() if omitted.
 
     Returns:
         str: Path to the main tree file (.treefile) or None.
     """
-    iqtree_cmd = check_iqtree()
+    iqtree_cmd = iqtree_cmd or check_iqtree()
     if not iqtree_cmd:
         logging.error("IQ-TREE not found in PATH. Please install IQ-TREE (iqtree or iqtree2).")
         return None # Critical failure for this step
 
     prefix = os.path.join(output_dir, "splace_tree")
     
-    # Command: iqtree2 -s file.nex -nt T -bb 1000 -m MFP --prefix ...
+    # Command: iqtree2 -s file.nex -nt AUTO -ntmax T -B 1000 -m MFP -pre ...
     # -s: Input (Nexus file determines alignment + partitions)
-    # -nt: AUTO or number
+    # -nt AUTO -ntmax T: let IQ-TREE benchmark and pick the best count up to T
     # -B: Ultrafast Bootstrap (1000)
     # -m: ModelFinder (MFP)
     
     cmd = [
         iqtree_cmd,
         "-s", supermatrix_path,
-        "-nt", str(threads),
+        "-nt", "AUTO",
+        "-ntmax", str(threads),
         "-B", str(bootstrap),
         "-m", model,
         "-pre", prefix,
@@ -326,21 +477,36 @@ def run_iqtree_analysis(supermatrix_path, output_dir, threads=1, bootstrap=1000,
     if extra_args and extra_args.strip():
         cmd.extend(extra_args.strip().split())
     
-    logging.info(f"Starting IQ-TREE analysis with {threads} threads...")
+    logging.info(f"Starting IQ-TREE analysis with up to {threads} threads...")
     logging.info(f"Command: {' '.join(cmd)}")
     
     try:
-        # IQ-TREE writes to stdout/stderr. Capturing and logging might be noisy, 
-        # but useful.
-        process = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        # IQ-TREE output is streamed line by line into a log file next to the
+        # results; only the tail is kept in memory for error reporting.
+        pipe_log = f"{prefix}.pipe.log"
+        tail = deque(maxlen=IQTREE_LOG_TAIL_LINES)
+        best_threads = None
+        with open(pipe_log, "w", encoding="utf-8") as log_file:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+            for line in process.stdout:
+                log_file.write(line)
+                tail.append(line)
+                if best_threads is None:
+                    match = IQTREE_BEST_THREADS_RE.search(line)
+                    if match:
+                        best_threads = match.group(1)
+            returncode = process.wait()
         
-        if process.returncode == 0:
+        if returncode == 0:
             logging.info("IQ-TREE analysis completed successfully.")
+            if best_threads:
+                logging.info(f"IQ-TREE selected {best_threads} threads.")
             tree_file = f"{prefix}.treefile"
             if os.path.exists(tree_file):
                 return tree_file
@@ -348,9 +514,9 @@ def run_iqtree_analysis(supermatrix_path, output_dir, threads=1, bootstrap=1000,
                 logging.warning(f"IQ-TREE finished 0 but {tree_file} not found.")
                 return None
         else:
-            logging.error(f"IQ-TREE failed with return code {process.returncode}")
-            # Log the tail of stderr/stdout
-            logging.error(f"IQ-TREE stderr: {process.stderr[-1000:]}")
+            logging.error(f"IQ-TREE failed with return code {returncode}")
+            # Log the tail of the combined stdout/stderr stream
+            logging.error(f"IQ-TREE output (last {len(tail)} lines, full log at {pipe_log}):\n{''.join(tail)}")
             return None
             
     except Exception as e:
@@ -365,15 +531,21 @@ def run_phylogeny_pipeline(trimmed_files, output_dir, threads=1, allow_missing=F
         logging.warning("No input files for phylogeny.")
         return None
 
+    # Fail before building the supermatrix if IQ-TREE cannot run anyway
+    iqtree_cmd = check_iqtree()
+    if not iqtree_cmd:
+        logging.error("IQ-TREE not found in PATH. Please install IQ-TREE (iqtree or iqtree2).")
+        return None
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True, mode=0o755)
 
     # Step 1: Supermatrix
-    supermatrix = prepare_supermatrix(trimmed_files, output_dir, allow_missing=allow_missing, report_dir=report_dir)
+    supermatrix = prepare_supermatrix(trimmed_files, output_dir, allow_missing=allow_missing, report_dir=report_dir, threads=threads)
     if not supermatrix:
         return None
 
     # Step 2: IQ-TREE
-    tree_file = run_iqtree_analysis(supermatrix, output_dir, threads, bootstrap=bootstrap, model=model, extra_args=extra_args)
+    tree_file = run_iqtree_analysis(supermatrix, output_dir, threads, bootstrap=bootstrap, model=model, extra_args=extra_args, iqtree_cmd=iqtree_cmd)
 
     return tree_file
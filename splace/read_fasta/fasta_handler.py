@@ -1,19 +1,57 @@
 import asyncio
 import logging
+import mmap
 import os
 import re
-import tempfile
+import shutil
 import threading
+from collections import defaultdict
 
-from Bio import SeqIO
-from SynGenes import SynGenes
-from concurrent.futures import ThreadPoolExecutor
+from splace._io_core import BufferedGeneWriter, resolve_gene_name, target_genes
+from splace.utils import gather_bounded, get_executor, get_process_executor
 
-sg = SynGenes(verbose=False)
-# Workaround: SynGenes 1.0.6 builds log path without separator and may
-# write to a read-only filesystem inside containers. Redirect to temp dir.
-SynGenes.cwd_path = tempfile.gettempdir() + os.sep
-GENE_NAME_CACHE = {}
+GENE_ATTRIBUTE_RE = re.compile(r'\[gene=([^\]]+)\]')
+PROTEIN_ATTRIBUTE_RE = re.compile(r'\[protein=([^\]]+)\]')
+# Block size for copying worker part files into the gene files
+COPY_BUFFER_SIZE = 1 << 20
+# Whitespace dropped from sequence lines, as SimpleFastaParser does
+SEQUENCE_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+def _iter_fasta_records(input_file):
+    """Yield (title, sequence) for each record of a FASTA file, scanning a memory map.
+
+    Record boundaries are found with mmap.find(b"\\n>") instead of reading the
+    file line by line. Only the title line is decoded; the sequence is returned
+    as bytes with whitespace removed, ready to be written out unchanged.
+    """
+    with open(input_file, "rb") as in_handle:
+        if os.fstat(in_handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(in_handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Skip any text before the first record
+            if mm[:1] == b">":
+                start = 0
+            else:
+                start = mm.find(b"\n>")
+                if start < 0:
+                    return
+                start += 1
+
+            size = len(mm)
+            while start < size:
+                title_end = mm.find(b"\n", start)
+                if title_end < 0:
+                    title_end = size
+                next_start = mm.find(b"\n>", title_end)
+                seq_end = size if next_start < 0 else next_start
+
+                title = mm[start + 1:title_end].decode("utf-8").rstrip()
+                sequence = mm[title_end:seq_end].translate(None, SEQUENCE_WHITESPACE)
+                yield title, sequence
+
+                if next_start < 0:
+                    break
+                start = next_start + 1
 
 # Thread-safe counter for unique record IDs across all FASTA files
 _uid_lock = threading.Lock()
@@ -26,16 +64,148 @@ def _next_uid():
         _uid_counter += 1
         return f"{_uid_counter:05d}"
 
+def _process_fasta(input_file, output_path, dtype, genes_filter, file_uid, part_files=False):
+    """Extract the target genes from one FASTA file; runs in a worker process.
+
+    Module-level so it can be pickled for the process pool. The file UID is
+    assigned by the caller, since worker processes do not share the counter.
+    With part_files, records go to `{gene}.{pid}.part` files private to this
+    worker instead of the shared `{gene}.fasta`; see _merge_part_files.
+    """
+    # Gene names to extract (None = everything), as a set for the per-record lookups
+    genes_set = target_genes(dtype, genes_filter)
+    syn_type = str(dtype) if dtype else "mt" # default mt if None
+
+    # Base name for the header
+    file_name = os.path.basename(input_file)
+    file_base_name = os.path.splitext(file_name)[0]
+    header_id = f"{file_base_name}_{file_uid}"
+    header_line = f">{header_id}\n".encode()
+
+    # Collect best (longest) sequence per gene per source to handle duplicates
+    best_per_gene = {}  # (gene_name, header_id) -> (seq_bytes, seq_len)
+
+    try:
+        for description, seq_bytes in _iter_fasta_records(input_file):
+            # Extract [gene=...] or [protein=...]
+            gene_match = GENE_ATTRIBUTE_RE.search(description)
+            protein_match = PROTEIN_ATTRIBUTE_RE.search(description)
+
+            gene_name = None
+
+            # 1. Try gene attribute
+            if gene_match:
+                raw_gene = gene_match.group(1)
+                # Check if it matches our target list (if filtering is enabled)
+                if genes_set:
+                    # Simple case insensitive check or partial match?
+                    # SynGenes normally handles this, but if we trust gene= tag:
+                    if raw_gene.upper() in genes_set:
+                         gene_name = raw_gene.upper()
+                    else:
+                         # Try to normalize if not exact match or check SynGenes
+                         gene_name = resolve_gene_name(raw_gene, syn_type, genes_set)
+                else:
+                    gene_name = raw_gene # No filter, extract everything
+
+            # 2. If no gene name yet, try checking the description header manually
+            if not gene_name:
+                parts = description.split()
+                # format: >atp8_ITV1046I2 atp8 ATP synthase F0 subunit 8 7816:7956 forward
+                if len(parts) > 1:
+                    candidate_gene = parts[1]
+                    # Check if simple candidate is in the list
+                    if genes_set and candidate_gene.upper() in genes_set:
+                        gene_name = candidate_gene.upper()
+                    elif genes_set:
+                        # Try SynGenes on the candidate token
+                        gene_name = resolve_gene_name(candidate_gene, syn_type, genes_set)
+                        if not gene_name:
+                            # Construct full name excluding coordinates (digit:digit)
+                            valid_parts = []
+                            for p in parts[2:]:
+                                # Same test as re.match(r'\d+:\d+', p), without the regex call
+                                if p[:1].isdigit() and ':' in p:
+                                    start, _, end = p.partition(':')
+                                    if start.isdigit() and end[:1].isdigit():
+                                        break
+                                valid_parts.append(p)
+
+                            if valid_parts:
+                                full_header_protein = " ".join(valid_parts)
+                                # Try normalizing the full description string
+                                gene_name = resolve_gene_name(full_header_protein, syn_type, genes_set)
+
+            # 3. If no gene name yet, try protein attribute
+            if not gene_name and protein_match:
+                raw_protein = protein_match.group(1)
+                gene_name = resolve_gene_name(raw_protein, syn_type, genes_set)
+
+            # 4. Final check against filter list and collect best sequence
+            if gene_name:
+                if genes_set and gene_name not in genes_set:
+                    continue
+
+                seq_len = len(seq_bytes)
+                key = (gene_name, header_id)
+
+                if key not in best_per_gene or seq_len > best_per_gene[key][1]:
+                    if key in best_per_gene:
+                        logging.info(f"Duplicate gene '{gene_name}' in {header_id}: keeping longer ({seq_len}bp over {best_per_gene[key][1]}bp)")
+                    best_per_gene[key] = (seq_bytes, seq_len)
+
+        # Write best sequences to files, opening each gene file once
+        file_suffix = f".{os.getpid()}.part" if part_files else ".fasta"
+        with BufferedGeneWriter(output_path, file_suffix) as writer:
+            for (gene_name, _), (seq_bytes, _) in best_per_gene.items():
+                writer.append(gene_name, header_line, seq_bytes)
+
+        if best_per_gene:
+            logging.info(f"Extracted {len(best_per_gene)} sequences from {file_name}")
+            return writer.written_files
+        else:
+            logging.warning(f"No matching genes found in {file_name}")
+            return []
+
+    except Exception as e:
+        logging.error(f"Error processing FASTA {file_name}: {e}")
+        return []
+
+def _merge_part_files(part_paths):
+    """Append each worker's `{gene}.{pid}.part` file to `{gene}.fasta` and delete it.
+
+    - Returns:
+        **List[str]**: Paths of the gene FASTA files that received records
+    """
+    gene_parts = defaultdict(list)
+    for part_path in sorted(part_paths):
+        gene_base = part_path[:-len(".part")].rsplit(".", 1)[0]
+        gene_parts[f"{gene_base}.fasta"].append(part_path)
+
+    for gene_path, parts in gene_parts.items():
+        with open(gene_path, "ab") as out_f:
+            for part_path in parts:
+                with open(part_path, "rb") as part_f:
+                    shutil.copyfileobj(part_f, out_f, COPY_BUFFER_SIZE)
+                os.remove(part_path)
+
+    return list(gene_parts)
+
 async def fasta_extractor(**kwargs):
     """
     ## Extract sequences from FASTA file based on gene/protein attributes
 
+    The default process pool spawns its workers, which re-import the calling
+    script: code that calls this from a script must run under an
+    `if __name__ == "__main__":` guard.
+
     - Args:
         - `fasta_file` (**str**): Input FASTA file path
         - `output_path` (**str**): Output directory for extracted gene files
         - `data_type` (**str**): Type of sequences to extract ("mt" for mitochondrial, "cp" for chloroplast)
-        - `executor` (**ThreadPoolExecutor**): Executor for blocking I/O
+        - `executor` (**Executor**, optional): Executor that runs the extraction. Defaults to the shared process pool from `splace.utils.get_process_executor()`.
         - `genes_filter` (**List[str]**, optional): List of specific gene names to extract. Overrides default genes_list.
+        - `part_files` (**bool**, optional): Write to per-worker `.part` files that the caller merges afterwards (default: False)
 
     - Returns:
         **List[str]**: List of paths to output files that were written to
@@ -45,6 +215,7 @@ async def fasta_extractor(**kwargs):
     data_type = kwargs.get("data_type", None)
     executor = kwargs.get("executor", None)
     genes_filter = kwargs.get("genes_filter", None)
+    part_files = kwargs.get("part_files", False)
 
     if not input_fasta_file or not os.path.exists(input_fasta_file):
         logging.error(f"Input FASTA file ({input_fasta_file}) not found.")
@@ -55,139 +226,25 @@ async def fasta_extractor(**kwargs):
     
     os.makedirs(output_fasta_path, exist_ok=True)
 
-    def _process_fasta(input_file, output_path, dtype, genes_filter):
-        written_files = set()
-
-        # Determine gene name filter list
-        if genes_filter:
-            genes_list = genes_filter
-        elif dtype == "mt":
-            genes_list = ["COI", "COII", "COIII", "CYTB", "ND1", "ND2", "ND3", "ND4", "ND4L", "ND5", "ND6", "ATP6", "ATP8"]
-        elif dtype == "cp":
-            genes_list = ["rbcL", "matK", "ndhF", "atpB", "psaA", "psbA", "psbB", "psbC", "psbD", "psbE", "psbF", "psbH", "psbI", "psbJ", "psbK", "psbL", "psbM", "psbN", "psbT"]
-        else:
-            genes_list = None
-
-        # Base name for the header
-        file_base_name = os.path.splitext(os.path.basename(input_file))[0]
-        file_uid = _next_uid()
-        header_id = f"{file_base_name}_{file_uid}"
-
-        # Collect best (longest) sequence per gene per source to handle duplicates
-        best_per_gene = {}  # (gene_name, header_id) -> (seq_str, seq_len)
-
-        try:
-            for record in SeqIO.parse(input_file, "fasta"):
-                description = record.description
-
-                # Extract [gene=...] or [protein=...]
-                gene_match = re.search(r'\[gene=([^\]]+)\]', description)
-                protein_match = re.search(r'\[protein=([^\]]+)\]', description)
-
-                gene_name = None
-
-                # 1. Try gene attribute
-                if gene_match:
-                    raw_gene = gene_match.group(1)
-                    # Check if it matches our target list (if filtering is enabled)
-                    if genes_list:
-                        # Simple case insensitive check or partial match?
-                        # SynGenes normally handles this, but if we trust gene= tag:
-                        if raw_gene.upper() in genes_list:
-                             gene_name = raw_gene.upper()
-                        else:
-                             # Try to normalize if not exact match or check SynGenes
-                             normalized = sg.fix_gene_name(geneName=raw_gene, type=str(dtype) if dtype else "mt") # default mt if None
-                             if normalized and normalized in genes_list:
-                                 gene_name = normalized
-                    else:
-                        gene_name = raw_gene # No filter, extract everything
-
-                # 2. If no gene name yet, try checking the description header manually
-                if not gene_name:
-                    parts = description.split()
-                    # format: >atp8_ITV1046I2 atp8 ATP synthase F0 subunit 8 7816:7956 forward
-                    if len(parts) > 1:
-                        candidate_gene = parts[1]
-                        # Check if simple candidate is in the list
-                        if genes_list and candidate_gene.upper() in genes_list:
-                            gene_name = candidate_gene.upper()
-                        elif genes_list:
-                            # Try SynGenes on the candidate token
-                            normalized = sg.fix_gene_name(geneName=candidate_gene, type=str(dtype) if dtype else "mt")
-                            if normalized and normalized in genes_list:
-                                gene_name = normalized
-                            else:
-                                # Construct full name excluding coordinates (digit:digit)
-                                valid_parts = []
-                                for p in parts[2:]:
-                                    if re.match(r'\d+:\d+', p):
-                                        break
-                                    valid_parts.append(p)
-
-                                if valid_parts:
-                                    full_header_protein = " ".join(valid_parts)
-                                    # Try normalizing the full description string
-                                    normalized_full = sg.fix_gene_name(geneName=full_header_protein, type=str(dtype) if dtype else "mt")
-                                    if normalized_full and normalized_full in genes_list:
-                                        gene_name = normalized_full
-
-                # 3. If no gene name yet, try protein attribute
-                if not gene_name and protein_match:
-                    raw_protein = protein_match.group(1)
-
-                    if raw_protein in GENE_NAME_CACHE.values():
-                        gene_name = next((k for k, v in GENE_NAME_CACHE.items() if v == raw_protein), None)
-                    else:
-                        normalized = sg.fix_gene_name(geneName=raw_protein, type=str(dtype) if dtype else "mt")
-                        if normalized:
-                            gene_name = normalized
-                            if raw_protein not in GENE_NAME_CACHE.values():
-                                GENE_NAME_CACHE[gene_name] = raw_protein
-
-                # 4. Final check against filter list and collect best sequence
-                if gene_name:
-                    if genes_list and gene_name not in genes_list:
-                        continue
-
-                    seq_str = str(record.seq)
-                    seq_len = len(seq_str)
-                    key = (gene_name, header_id)
-
-                    if key not in best_per_gene or seq_len > best_per_gene[key][1]:
-                        if key in best_per_gene:
-                            logging.info(f"Duplicate gene '{gene_name}' in {header_id}: keeping longer ({seq_len}bp over {best_per_gene[key][1]}bp)")
-                        best_per_gene[key] = (seq_str, seq_len)
-
-            # Write best sequences to files
-            for (gene_name, header_id), (seq_str, _) in best_per_gene.items():
-                output_file_path = os.path.join(output_path, f"{gene_name}.fasta")
-                with open(output_file_path, "a+") as out_f:
-                    out_f.write(f">{header_id}\n{seq_str}\n")
-                written_files.add(output_file_path)
-
-            if best_per_gene:
-                logging.info(f"Extracted {len(best_per_gene)} sequences from {os.path.basename(input_file)}")
-                return list(written_files)
-            else:
-                logging.warning(f"No matching genes found in {os.path.basename(input_file)}")
-                return []
-
-        except Exception as e:
-            logging.error(f"Error processing FASTA {os.path.basename(input_file)}: {e}")
-            return []
-
     loop = asyncio.get_running_loop()
-    if executor is None:
-        with ThreadPoolExecutor() as local_executor:
-            return await loop.run_in_executor(local_executor, _process_fasta, input_fasta_file, output_fasta_path, data_type, genes_filter)
-    else:
-        return await loop.run_in_executor(executor, _process_fasta, input_fasta_file, output_fasta_path, data_type, genes_filter)
+    return await loop.run_in_executor(
+        executor or get_process_executor(),
+        _process_fasta,
+        input_fasta_file,
+        output_fasta_path,
+        data_type,
+        genes_filter,
+        _next_uid(),
+        part_files,
+    )
 
 async def extract_multiple_fastas(**kwargs):
     """
     ## Process multiple FASTA files
 
+    Runs on the shared process pool; see `fasta_extractor` for the
+    `if __name__ == "__main__":` requirement.
+
     - Args:
         - `fasta_files` (**List[str]**): List of FASTA file paths
         - `output_dir` (**str**): Output directory
@@ -207,31 +264,32 @@ async def extract_multiple_fastas(**kwargs):
     if not os.path.exists(output_directory):
         os.makedirs(output_directory, exist_ok=True, mode=0o755)
 
-    semaphore = asyncio.Semaphore(max_concurrent)
-    executor = ThreadPoolExecutor(max_workers=max_concurrent)
+    executor = get_process_executor()
 
     async def extract_single_file(f_file):
-        async with semaphore:
-            return await fasta_extractor(
-                fasta_file=f_file,
-                output_path=output_directory,
-                data_type=data_type,
-                executor=executor,
-                genes_filter=genes_filter
-            )
-
-    tasks = [extract_single_file(f) for f in list_files]
+        return await fasta_extractor(
+            fasta_file=f_file,
+            output_path=output_directory,
+            data_type=data_type,
+            executor=executor,
+            genes_filter=genes_filter,
+            part_files=True
+        )
+
     logging.info(f"Starting extraction from {len(list_files)} FASTA files")
     
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    executor.shutdown(wait=False)
+    results = await gather_bounded(list_files, extract_single_file, max_concurrent)
 
-    extracted_files = set()
+    part_paths = set()
     for i, result in enumerate(results):
         if isinstance(result, Exception):
             logging.error(f"Error processing {list_files[i]}: {result}")
         elif isinstance(result, list):
-            extracted_files.update(result)
+            part_paths.update(result)
+
+    # Workers never share an output file; one thread concatenates their parts
+    loop = asyncio.get_running_loop()
+    extracted_files = await loop.run_in_executor(get_executor(), _merge_part_files, part_paths)
     
     logging.info(f"FASTA extraction completed. {len(extracted_files)} unique gene files updated.")
     
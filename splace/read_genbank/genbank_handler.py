@@ -3,22 +3,20 @@ import csv
 import logging
 import os
 import re
-import tempfile
 import threading
 import warnings
 
 import requests
 
 from Bio import BiopythonParserWarning, SeqIO
-from SynGenes import SynGenes
 
-from concurrent.futures import ThreadPoolExecutor
+from splace._io_core import BufferedGeneWriter, fix_gene_name, target_genes
+from splace.utils import gather_bounded, get_executor
 
 # Suppress BiopythonParserWarning globally — warnings.catch_warnings() is not
 # thread-safe, so per-thread suppression inside ThreadPoolExecutor is unreliable.
 warnings.filterwarnings("ignore", category=BiopythonParserWarning)
 
-GENE_NAME_CACHE = {}
 GBIF_CACHE = {}
 FASTA_HEADER_FIELDS = {
     "accession",
@@ -51,6 +49,8 @@ REPORT_METADATA_FIELDS = [
 ]
 INVALID_SPECIES_FIELDS = ["file_name", "accession", "organism", "reason"]
 MISSING_HEADER_FIELDS = ["file_name", "marker", "accession", "organism", "missing_fields", "header"]
+# Read inputs in 1 MiB blocks; multi-GB GenBank files otherwise cost one read() per 8 KiB
+READ_BUFFER_SIZE = 1 << 20
 HEADER_PLACEHOLDER_RE = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
 VALID_BINOMIAL_RE = re.compile(r"^[A-Z][A-Za-z.-]+\s+[a-z][A-Za-z.-]+$")
 
@@ -67,12 +67,6 @@ def _next_uid():
         return f"{_uid_counter:05d}"
 
 
-sg = SynGenes(verbose=False)
-# Workaround: SynGenes 1.0.6 builds log path without separator and may
-# write to a read-only filesystem inside containers. Redirect to temp dir.
-SynGenes.cwd_path = tempfile.gettempdir() + os.sep
-
-
 def _extract_accession(record):
     accessions = getattr(record, "annotations", {}).get("accessions", []) or []
     if accessions:
@@ -157,8 +151,7 @@ def _build_fasta_header(template, metadata, missing_value):
     return header, list(dict.fromkeys(missing_fields))
 
 
-def _extract_record_metadata(record, input_gb_file, record_uid, gbif_enabled):
-    file_name = os.path.basename(input_gb_file)
+def _extract_record_metadata(record, file_name, record_uid, gbif_enabled):
     accession = _extract_accession(record)
     organism = getattr(record, "annotations", {}).get("organism", f"Unknown Species in {file_name}")
     genus, species = _split_organism_name(organism)
@@ -232,7 +225,7 @@ async def genbank_to_fasta(**kwargs):
         - `genbank_file` (**str**): Input GenBank file path
         - `output_path` (**str**): Output FASTA file path
         - `data_type` (**str**): Type of sequences to extract ("mt" for mitochondrial, "cp" for chloroplast)
-        - `executor` (**ThreadPoolExecutor**): Executor for blocking I/O
+        - `executor` (**ThreadPoolExecutor**, optional): Executor for blocking I/O. Defaults to the shared pool from `splace.utils.get_executor()`.
         - `genes_filter` (**List[str]**, optional): List of specific gene names to extract. Overrides default genes_list.
         - `feature_types` (**List[str]**, optional): List of GenBank feature types to scan (e.g., ["CDS", "rRNA", "tRNA"]). Default: ["CDS"].
 
@@ -264,140 +257,130 @@ async def genbank_to_fasta(**kwargs):
     os.makedirs(output_fasta_path, exist_ok=True)
 
     def _process_genbank(input_gb_file, output_fasta_path, data_type, genes_filter, feature_types, gbif_enabled, header_template, missing_value):
-        written_files = set()
+        file_name = os.path.basename(input_gb_file)
         metadata_rows = []
         invalid_species_rows = []
         missing_header_rows = []
 
-        if feature_types:
-            target_feature_types = feature_types
-        else:
-            target_feature_types = ["CDS"]
-
-        if genes_filter:
-            genes_list = genes_filter
-        elif data_type == "mt":
-            genes_list = ["COI", "COII", "COIII", "CYTB", "ND1", "ND2", "ND3", "ND4", "ND4L", "ND5", "ND6", "ATP6", "ATP8"]
-        elif data_type == "cp":
-            genes_list = ["rbcL", "matK", "ndhF", "atpB", "psaA", "psbA", "psbB", "psbC", "psbD", "psbE", "psbF", "psbH", "psbI", "psbJ", "psbK", "psbL", "psbM", "psbN", "psbT"]
-        else:
-            genes_list = None
+        # Exact-match set; a bare string such as "CDS" would otherwise be a substring test
+        if isinstance(feature_types, str):
+            feature_types = [feature_types]
+        target_feature_types = frozenset(feature_types) if feature_types else frozenset(("CDS",))
+
+        # Gene names to extract (None = everything), as a set for the per-feature lookups
+        genes_set = target_genes(data_type, genes_filter)
 
         best_per_gene = {}
 
         try:
-            records = list(SeqIO.parse(input_gb_file, "genbank"))
-            for record in records:
-                record_uid = _next_uid()
-                record_metadata, metadata_row, invalid_species = _extract_record_metadata(
-                    record=record,
-                    input_gb_file=input_gb_file,
-                    record_uid=record_uid,
-                    gbif_enabled=gbif_enabled,
-                )
-                metadata_rows.append(metadata_row)
-                if invalid_species:
-                    invalid_species_rows.append(invalid_species)
-
-                header_body, header_missing_fields = _build_fasta_header(
-                    template=header_template,
-                    metadata=record_metadata,
-                    missing_value=missing_value,
-                )
-                header = f">{header_body}"
-                record_key = f"{record_metadata['organism']}_{record_metadata['accession']}_{record_uid}"
-
-                for feature in record.features:
-                    if feature.type not in target_feature_types:
-                        continue
-
-                    product = feature.qualifiers.get("product", [None])[0]
-                    gene_qualifier = feature.qualifiers.get("gene", [None])[0]
-                    raw_name = gene_qualifier or product
-
-                    if not raw_name:
-                        continue
-
-                    if raw_name in GENE_NAME_CACHE:
-                        gene_name = GENE_NAME_CACHE[raw_name]
-                    else:
-                        gene_name = sg.fix_gene_name(geneName=raw_name, type=str(data_type)) if data_type else raw_name
-                        if gene_name and gene_name != "None":
-                            GENE_NAME_CACHE[raw_name] = gene_name
-
-                    if not gene_name or gene_name == "None":
-                        logging.warning(
-                            f"Could not standardize gene name for '{raw_name}' in file {os.path.basename(input_gb_file)}"
-                        )
-                        continue
+            with open(input_gb_file, buffering=READ_BUFFER_SIZE) as gb_handle:
+                for record in SeqIO.parse(gb_handle, "genbank"):
+                    record_uid = _next_uid()
+                    record_metadata, metadata_row, invalid_species = _extract_record_metadata(
+                        record=record,
+                        file_name=file_name,
+                        record_uid=record_uid,
+                        gbif_enabled=gbif_enabled,
+                    )
+                    metadata_rows.append(metadata_row)
+                    if invalid_species:
+                        invalid_species_rows.append(invalid_species)
+
+                    header_body, header_missing_fields = _build_fasta_header(
+                        template=header_template,
+                        metadata=record_metadata,
+                        missing_value=missing_value,
+                    )
+                    header = f">{header_body}"
+                    header_line = f"{header}\n".encode("utf-8")
+                    record_key = f"{record_metadata['organism']}_{record_metadata['accession']}_{record_uid}"
 
-                    if genes_list and gene_name not in genes_list:
-                        continue
+                    # Most features (source, gene, tRNA, ...) are not targets; drop them before any qualifier access
+                    target_features = [feature for feature in record.features if feature.type in target_feature_types]
+                    for feature in target_features:
+                        product = feature.qualifiers.get("product", [None])[0]
+                        gene_qualifier = feature.qualifiers.get("gene", [None])[0]
+                        raw_name = gene_qualifier or product
 
-                    loc = feature.location
-                    if hasattr(loc, "start") and hasattr(loc, "end") and int(loc.start) > int(loc.end):
-                        logging.warning(
-                            f"Skipping feature '{raw_name}' in {os.path.basename(input_gb_file)}: invalid location {loc} (start > end)"
-                        )
-                        continue
+                        if not raw_name:
+                            continue
 
-                    try:
-                        seq_str = str(feature.extract(record.seq))
-                    except Exception as exc:
-                        logging.warning(
-                            f"Skipping feature '{raw_name}' in {os.path.basename(input_gb_file)}: extraction failed ({exc})"
-                        )
-                        continue
-
-                    seq_len = len(seq_str)
-                    key = (gene_name, record_key)
-                    if key not in best_per_gene or seq_len > best_per_gene[key]["length"]:
-                        if key in best_per_gene:
-                            logging.info(
-                                f"Duplicate gene '{gene_name}' in {record_key}: keeping longer ({seq_len}bp over {best_per_gene[key]['length']}bp)"
+                        gene_name = fix_gene_name(raw_name, str(data_type)) if data_type else raw_name
+
+                        if not gene_name or gene_name == "None":
+                            logging.warning(
+                                f"Could not standardize gene name for '{raw_name}' in file {file_name}"
                             )
-                        best_per_gene[key] = {
-                            "header": header,
-                            "length": seq_len,
-                            "marker": gene_name,
-                            "missing_fields": header_missing_fields,
-                            "organism": metadata_row["organism"],
-                            "sequence": seq_str,
-                            "accession": record_metadata["accession"],
-                        }
-
-            for (gene_name, _), entry in best_per_gene.items():
-                output_file_path = os.path.join(output_fasta_path, f"{gene_name}.fasta")
-                with open(output_file_path, "a+", encoding="utf-8") as output_file:
-                    output_file.write(f"{entry['header']}\n{entry['sequence']}\n")
-                written_files.add(output_file_path)
-
-                if entry["missing_fields"]:
-                    missing_header_rows.append(
-                        {
-                            "file_name": os.path.basename(input_gb_file),
-                            "marker": gene_name,
-                            "accession": entry["accession"],
-                            "organism": entry["organism"],
-                            "missing_fields": ",".join(entry["missing_fields"]),
-                            "header": entry["header"][1:],
-                        }
-                    )
+                            continue
+
+                        if genes_set and gene_name not in genes_set:
+                            continue
+
+                        loc = feature.location
+                        if hasattr(loc, "start") and hasattr(loc, "end") and int(loc.start) > int(loc.end):
+                            logging.warning(
+                                f"Skipping feature '{raw_name}' in {file_name}: invalid location {loc} (start > end)"
+                            )
+                            continue
+
+                        try:
+                            # Seq keeps its residues as bytes, so no str round-trip is needed for output
+                            seq_bytes = bytes(feature.extract(record.seq))
+                        except Exception as exc:
+                            logging.warning(
+                                f"Skipping feature '{raw_name}' in {file_name}: extraction failed ({exc})"
+                            )
+                            continue
+
+                        seq_len = len(seq_bytes)
+                        key = (gene_name, record_key)
+                        if key not in best_per_gene or seq_len > best_per_gene[key]["length"]:
+                            if key in best_per_gene:
+                                logging.info(
+                                    f"Duplicate gene '{gene_name}' in {record_key}: keeping longer ({seq_len}bp over {best_per_gene[key]['length']}bp)"
+                                )
+                            best_per_gene[key] = {
+                                "header": header,
+                                "header_line": header_line,
+                                "length": seq_len,
+                                "marker": gene_name,
+                                "missing_fields": header_missing_fields,
+                                "organism": metadata_row["organism"],
+                                "sequence": seq_bytes,
+                                "accession": record_metadata["accession"],
+                            }
+
+            # Group output by gene so each marker file is opened once per input file
+            with BufferedGeneWriter(output_fasta_path) as writer:
+                for (gene_name, _), entry in best_per_gene.items():
+                    writer.append(gene_name, entry["header_line"], entry["sequence"])
+
+                    if entry["missing_fields"]:
+                        missing_header_rows.append(
+                            {
+                                "file_name": file_name,
+                                "marker": gene_name,
+                                "accession": entry["accession"],
+                                "organism": entry["organism"],
+                                "missing_fields": ",".join(entry["missing_fields"]),
+                                "header": entry["header"][1:],
+                            }
+                        )
 
             if best_per_gene:
-                logging.info(f"Converted {len(best_per_gene)} sequences from {os.path.basename(input_gb_file)} to FASTA")
+                logging.info(f"Converted {len(best_per_gene)} sequences from {file_name} to FASTA")
             else:
-                logging.warning(f"No matching sequences found in {os.path.basename(input_gb_file)}")
+                logging.warning(f"No matching sequences found in {file_name}")
 
             return {
-                "written_files": list(written_files),
+                "written_files": writer.written_files,
                 "metadata_rows": metadata_rows,
                 "invalid_species_rows": invalid_species_rows,
                 "missing_header_rows": missing_header_rows,
             }
 
         except Exception as exc:
-            logging.error(f"Error converting {os.path.basename(input_gb_file)}: {exc}")
+            logging.error(f"Error converting {file_name}: {exc}")
             return {
                 "written_files": [],
                 "metadata_rows": metadata_rows,
@@ -406,23 +389,8 @@ async def genbank_to_fasta(**kwargs):
             }
 
     loop = asyncio.get_running_loop()
-    if executor is None:
-        with ThreadPoolExecutor() as local_executor:
-            return await loop.run_in_executor(
-                local_executor,
-                _process_genbank,
-                input_gb_file,
-                output_fasta_path,
-                data_type,
-                genes_filter,
-                feature_types,
-                gbif_enabled,
-                header_template,
-                missing_value,
-            )
-
     return await loop.run_in_executor(
-        executor,
+        executor or get_executor(),
         _process_genbank,
         input_gb_file,
         output_fasta_path,
@@ -469,28 +437,24 @@ async def extract_multiple_genbanks(**kwargs):
         logging.info(f"Creating output directory: {output_directory}")
         os.makedirs(output_directory, exist_ok=True, mode=0o755)
 
-    semaphore = asyncio.Semaphore(max_concurrent)
-    executor = ThreadPoolExecutor(max_workers=max_concurrent)
+    executor = get_executor()
 
     async def convert_single_file(gb_file):
-        async with semaphore:
-            return await genbank_to_fasta(
-                genbank_file=gb_file,
-                output_path=output_directory,
-                data_type=data_type,
-                executor=executor,
-                genes_filter=genes_filter,
-                feature_types=feature_types,
-                gbif_enabled=gbif_enabled,
-                header_template=header_template,
-                missing_value=missing_value,
-            )
-
-    tasks = [convert_single_file(gb_file) for gb_file in list_gb_files]
+        return await genbank_to_fasta(
+            genbank_file=gb_file,
+            output_path=output_directory,
+            data_type=data_type,
+            executor=executor,
+            genes_filter=genes_filter,
+            feature_types=feature_types,
+            gbif_enabled=gbif_enabled,
+            header_template=header_template,
+            missing_value=missing_value,
+        )
+
     logging.info(f"Starting conversion of {len(list_gb_files)} GenBank files")
 
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    executor.shutdown(wait=False)
+    results = await gather_bounded(list_gb_files, convert_single_file, max_concurrent)
 
     converted_files = set()
     metadata_rows = []
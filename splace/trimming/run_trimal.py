@@ -1,8 +1,19 @@
 import asyncio
+import functools
 import logging
 import os
+import shlex
 import shutil
+import signal
 import sys
+import tempfile
+
+from splace.utils import gather_bounded
+
+@functools.lru_cache(maxsize=None)
+def check_trimal():
+    """Check if TrimAl is installed and return its full path, or None. The lookup is cached."""
+    return shutil.which("trimal")
 
 async def trimal_trimming(**kwargs):
     """
@@ -11,7 +22,7 @@ async def trimal_trimming(**kwargs):
     - Args:
         - `input_file` (**str**): Input aligned FASTA file path
         - `output_file` (**str**): Output trimmed FASTA file path
-        - `trimal_params` (**str**): TrimAl parameters (default: "-automated1")
+        - `trimal_params` (**str** | **List[str]**): TrimAl parameters, as a string or already split (default: "-automated1")
         - `timeout` (**int**): Timeout in seconds (default: 3600)
     
     - Returns:
@@ -22,7 +33,8 @@ async def trimal_trimming(**kwargs):
     trimal_params = kwargs.get("trimal_params", "-automated1")
     timeout = kwargs.get("timeout", 3600)
 
-    if shutil.which("trimal") is None:
+    trimal_bin = check_trimal()
+    if trimal_bin is None:
         logging.error("TrimAl is not installed or not found in PATH. Please install TrimAl and try again.")
         sys.exit(1)
     
@@ -34,29 +46,31 @@ async def trimal_trimming(**kwargs):
         base_name = os.path.splitext(input_file)[0]
         output_file = f"{base_name}_trimmed.fasta"
     
-    cmd = ["trimal", "-in", input_file, "-out", output_file]
+    input_name = os.path.basename(input_file)
+    cmd = [trimal_bin, "-in", input_file, "-out", output_file]
 
     if trimal_params:
-        cmd.extend(trimal_params.split())
+        cmd.extend(trimal_params.split() if isinstance(trimal_params, str) else trimal_params)
 
     try:
-        logging.info(f"Starting TrimAl for {os.path.basename(input_file)}, please wait...")
+        logging.info(f"Starting TrimAl for {input_name}, please wait...")
 
+        # TrimAl reports errors on stderr; its stdout is never used
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE
         )
         
         try:
-            stdout, stderr = await asyncio.wait_for(
+            _, stderr = await asyncio.wait_for(
                 process.communicate(),
                 timeout=timeout
             )
         except asyncio.TimeoutError:
             process.kill()
             await process.wait()
-            logging.error(f"TrimAl timed out for {os.path.basename(input_file)}")
+            logging.error(f"TrimAl timed out for {input_name}")
             return None
         
         if process.returncode == 0:
@@ -64,14 +78,126 @@ async def trimal_trimming(**kwargs):
             return output_file
         else:
             error_msg = stderr.decode('utf-8')
-            msg = error_msg if error_msg else stdout.decode('utf-8')
-            logging.error(f"TrimAl error for {os.path.basename(input_file)}: {msg}")
+            msg = error_msg if error_msg else f"exit code {process.returncode}"
+            logging.error(f"TrimAl error for {input_name}: {msg}")
             return None
             
     except Exception as e:
-        logging.error(f"Error running TrimAl for {os.path.basename(input_file)}: {e}")
+        logging.error(f"Error running TrimAl for {input_name}: {e}")
         return None
 
+async def trimal_batch_trimming(**kwargs):
+    """
+    ## Run TrimAl on several aligned FASTA files inside a single shell process
+    
+    Saves one Python-side process launch per file when trimming many small
+    alignments. Requires a POSIX shell.
+    
+    - Args:
+        - `input_files` (**List[str]**): Input aligned FASTA file paths
+        - `output_files` (**List[str]**): Output trimmed FASTA file paths, one per input
+        - `trimal_params` (**str** | **List[str]**): TrimAl parameters (default: "-automated1")
+        - `timeout` (**int**): Timeout in seconds for each file; a file that runs over is dropped and the rest of the batch continues (default: 3600)
+    
+    - Returns:
+        **List[str]**: Output path for each input, None where trimming failed
+    """
+    input_files = kwargs.get("input_files", [])
+    output_files = kwargs.get("output_files", [])
+    trimal_params = kwargs.get("trimal_params", "-automated1")
+    timeout = kwargs.get("timeout", 3600)
+
+    trimal_bin = check_trimal()
+    if trimal_bin is None:
+        logging.error("TrimAl is not installed or not found in PATH. Please install TrimAl and try again.")
+        sys.exit(1)
+
+    if isinstance(trimal_params, str):
+        trimal_params = trimal_params.split()
+
+    results = [None] * len(input_files)
+    positions = []
+    for position, (input_file, output_file) in enumerate(zip(input_files, output_files)):
+        if not os.path.exists(input_file):
+            logging.error(f"Input aligned file ({input_file}) not found.")
+            continue
+        results[position] = output_file
+        positions.append(position)
+
+    if not positions:
+        return results
+
+    batch_names = ", ".join(os.path.basename(f) for f in input_files)
+
+    try:
+        logging.info(f"Starting TrimAl batch for {batch_names}, please wait...")
+
+        with tempfile.TemporaryDirectory(prefix="splace_trimal_") as stderr_dir:
+            pending = positions
+            while pending:
+                # Each file gets its own stderr capture and reports "<position> <exit status>"
+                # on stdout when it ends, so the timeout applies to each file in turn
+                lines = []
+                for position in pending:
+                    cmd = [trimal_bin, "-in", input_files[position], "-out", output_files[position], *trimal_params]
+                    stderr_file = os.path.join(stderr_dir, f"{position}.err")
+                    lines.append(f"{shlex.join(cmd)} > /dev/null 2> {shlex.quote(stderr_file)}; echo {position} $?")
+
+                # Own process group, so a timeout can kill TrimAl and not just the shell
+                process = await asyncio.create_subprocess_shell(
+                    "\n".join(lines),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+
+                finished = 0
+                try:
+                    while finished < len(pending):
+                        line = await asyncio.wait_for(process.stdout.readline(), timeout=timeout)
+                        if not line:
+                            break
+                        position, returncode = map(int, line.split())
+                        finished += 1
+                        if returncode != 0:
+                            with open(os.path.join(stderr_dir, f"{position}.err"), encoding="utf-8", errors="replace") as f:
+                                error_msg = f.read()
+                            msg = error_msg if error_msg else f"exit code {returncode}"
+                            logging.error(f"TrimAl error for {os.path.basename(input_files[position])}: {msg}")
+                            results[position] = None
+                except asyncio.TimeoutError:
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    await process.wait()
+                    # Only the running file is dropped; the rest of the batch starts again
+                    position = pending[finished]
+                    if os.path.exists(output_files[position]):
+                        os.remove(output_files[position])
+                    logging.error(f"TrimAl timed out for {os.path.basename(input_files[position])}")
+                    results[position] = None
+                    pending = pending[finished + 1:]
+                    continue
+
+                stderr = await process.stderr.read()
+                await process.wait()
+                if stderr:
+                    logging.error(f"TrimAl batch shell error for {batch_names}: {stderr.decode('utf-8')}")
+                for position in pending[finished:]:
+                    logging.error(f"TrimAl did not run for {os.path.basename(input_files[position])}")
+                    results[position] = None
+                pending = []
+
+        for output_file in results:
+            if output_file is not None:
+                logging.info(f"TrimAl completed for {os.path.basename(output_file)}")
+        return results
+
+    except Exception as e:
+        logging.error(f"Error running TrimAl batch for {batch_names}: {e}")
+        return [None] * len(input_files)
+
 async def trim_multiple_files(**kwargs):
     """
     ## Trim multiple aligned FASTA files using TrimAl with concurrency control
@@ -82,6 +208,7 @@ async def trim_multiple_files(**kwargs):
         - `max_concurrent` (**int**): Maximum concurrent processes (default: 5)
         - `trimal_params` (**str**): TrimAl parameters
         - `timeout` (**int**): Timeout per process
+        - `batch_size` (**int**): Files trimmed per TrimAl shell process (default: 1, one process per file)
 
     - Returns:
         **List[str]**: List of successfully trimmed file paths
@@ -91,6 +218,7 @@ async def trim_multiple_files(**kwargs):
     max_concurrent = kwargs.get("max_concurrent", 5)
     trimal_params = kwargs.get("trimal_params", "-automated1")
     timeout = kwargs.get("timeout", 3600)
+    batch_size = kwargs.get("batch_size", 1)
     
     if not list_files:
         logging.warning("No alignment files provided for trimming")
@@ -99,32 +227,46 @@ async def trim_multiple_files(**kwargs):
     if not os.path.exists(output_directory):
         logging.info(f"Creating output directory: {output_directory}")
         os.makedirs(output_directory, exist_ok=True, mode=0o755)
+
+    # Split once here rather than in every trimal_trimming call
+    params_list = trimal_params.split() if isinstance(trimal_params, str) else trimal_params
+
+    if batch_size > 1 and os.name == "nt":
+        logging.warning("TrimAl batch mode requires a POSIX shell. Trimming files individually.")
+        batch_size = 1
+    batch_size = max(1, batch_size)
+    batches = [list_files[i:i + batch_size] for i in range(0, len(list_files), batch_size)]
+
+    def trimmed_output_path(input_file):
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        return os.path.join(output_directory, f"{base_name}_trimmed.fasta")
     
-    semaphore = asyncio.Semaphore(max_concurrent)
-    
-    async def trim_single_file(**kwargs):
-        input_file = kwargs.get('input_file')
-        async with semaphore:
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            output_file = os.path.join(output_directory, f"{base_name}_trimmed.fasta")
-            
-            return await trimal_trimming(
-                input_file=input_file,
-                output_file=output_file,
-                trimal_params=trimal_params,
+    async def trim_batch(batch):
+        """Trim a batch of files"""
+        if len(batch) == 1:
+            return [await trimal_trimming(
+                input_file=batch[0],
+                output_file=trimmed_output_path(batch[0]),
+                trimal_params=params_list,
                 timeout=timeout
-            )
+            )]
+
+        return await trimal_batch_trimming(
+            input_files=batch,
+            output_files=[trimmed_output_path(f) for f in batch],
+            trimal_params=params_list,
+            timeout=timeout
+        )
     
-    tasks = [trim_single_file(input_file=f) for f in list_files]
     logging.info(f"Starting trimming of {len(list_files)} files with {max_concurrent} concurrent processes")
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await gather_bounded(batches, trim_batch, max_concurrent)
     
     trimmed_files = []
-    for i, result in enumerate(results):
+    for batch, result in zip(batches, results):
         if isinstance(result, Exception):
-            logging.error(f"Error trimming {list_files[i]}: {result}")
-        elif result is not None:
-            trimmed_files.append(result)
+            logging.error(f"Error trimming {', '.join(batch)}: {result}")
+        else:
+            trimmed_files.extend(r for r in result if r is not None)
     
     logging.info(f"Trimming completed: {len(trimmed_files)}/{len(list_files)} successful")
     
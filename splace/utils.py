@@ -1,9 +1,114 @@
+import asyncio
+import atexit
+import threading
 import time
 import os
+import sys
 import csv
 import logging
+import logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
+_EXECUTOR = None
+_PROCESS_EXECUTOR = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide thread pool for blocking pipeline work, creating it on first use.
+
+    The pool is shared by every extraction stage and shut down (waiting for
+    running jobs) at interpreter exit, instead of one pool per batch.
+    """
+    global _EXECUTOR
+    with _executor_lock:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="splace")
+            atexit.register(_EXECUTOR.shutdown, wait=True)
+        return _EXECUTOR
+
+
+def _init_process_worker(log_queue, log_level):
+    """Send a worker process's log records back to the parent through log_queue.
+
+    The worker's stdout is discarded: each spawned worker re-imports SynGenes,
+    which prints its "Module ... found and imported!" banner on import.
+    """
+    sys.stdout = open(os.devnull, "w")
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+
+
+def get_process_executor():
+    """Return the process-wide pool for CPU-bound parsing, creating it on first use.
+
+    Workers are spawned rather than forked (the parent already runs the event
+    loop and thread pool) and their log records are replayed through the
+    parent's handlers by a QueueListener. The pool is shut down at exit.
+    """
+    global _PROCESS_EXECUTOR
+    with _executor_lock:
+        if _PROCESS_EXECUTOR is None:
+            context = multiprocessing.get_context("spawn")
+            root_logger = logging.getLogger()
+            log_queue = context.Queue()
+            listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+            listener.start()
+            _PROCESS_EXECUTOR = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=context,
+                initializer=_init_process_worker,
+                initargs=(log_queue, root_logger.level),
+            )
+            # atexit runs handlers last-in first-out: stop the listener after the pool drains
+            atexit.register(listener.stop)
+            atexit.register(_PROCESS_EXECUTOR.shutdown, wait=True)
+        return _PROCESS_EXECUTOR
+
+
+async def gather_bounded(items, worker, max_concurrent):
+    """Await worker(item) for every item with at most max_concurrent running at once.
+
+    A fixed pool of tasks pulls items from a queue, so only max_concurrent
+    coroutines exist at a time however many items there are. Results come
+    back in input order and exceptions are returned in place, as with
+    asyncio.gather(..., return_exceptions=True). A worker calling sys.exit()
+    cancels the other tasks and the SystemExit is raised from here, so the
+    caller exits as it would outside the task group.
+    """
+    results = [None] * len(items)
+    exits = []
+    tasks = []
+    queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+
+    async def consume():
+        while not queue.empty():
+            index, item = queue.get_nowait()
+            try:
+                results[index] = await worker(item)
+            except Exception as exc:
+                results[index] = exc
+            except (SystemExit, KeyboardInterrupt) as exc:
+                exits.append(exc)
+                for task in tasks:
+                    if task is not asyncio.current_task():
+                        task.cancel()
+                return
+
+    async with asyncio.TaskGroup() as task_group:
+        for _ in range(max(1, min(max_concurrent, len(items)))):
+            tasks.append(task_group.create_task(consume()))
+
+    if exits:
+        raise exits[0]
+    return results
+
+
 class Benchmark:
     def __init__(self, output_path="benchmark.tsv", enabled=False):
         self.output_path = output_path
@@ -14,17 +119,18 @@ class Benchmark:
     def start(self, step_name):
         """Start a timer for a specific step."""
         if not self.enabled: return
-        self.start_times[step_name] = time.time()
+        self.start_times[step_name] = time.perf_counter_ns()
         logging.info(f"Benchmark started for: {step_name}")
 
     def stop(self, step_name):
         """Stop the timer for a specific step."""
         if not self.enabled: return
         if step_name in self.start_times:
-            elapsed = time.time() - self.start_times[step_name]
+            # Monotonic integer nanoseconds: immune to clock adjustments, no float drift when accumulating
+            elapsed_ns = time.perf_counter_ns() - self.start_times[step_name]
             # Accumulate time if step is called multiple times (though splace is linear)
-            self.timings[step_name] = self.timings.get(step_name, 0) + elapsed
-            logging.info(f"Benchmark finished for: {step_name} ({elapsed:.2f}s)")
+            self.timings[step_name] = self.timings.get(step_name, 0) + elapsed_ns
+            logging.info(f"Benchmark finished for: {step_name} ({elapsed_ns / 1e9:.2f}s)")
             del self.start_times[step_name]
         else:
             logging.warning(f"Benchmark stop called for {step_name} without start.")
@@ -39,21 +145,16 @@ class Benchmark:
         headers = ["Date", "Input_Directory", "File_Count", "Step", "Duration_Seconds"]
         
         try:
+            date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            input_name = os.path.basename(os.path.abspath(input_dir))
+            rows = [] if file_exists else [headers]
+            rows.extend(
+                [date_str, input_name, file_count, step, f"{duration_ns / 1e9:.4f}"]
+                for step, duration_ns in self.timings.items()
+            )
+
             with open(self.output_path, "a", newline="") as f:
-                writer = csv.writer(f, delimiter="\t")
-                if not file_exists:
-                    writer.writerow(headers)
-                
-                date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                for step, duration in self.timings.items():
-                    writer.writerow([
-                        date_str,
-                        os.path.basename(os.path.abspath(input_dir)),
-                        file_count,
-                        step,
-                        f"{duration:.4f}"
-                    ])
+                csv.writer(f, delimiter="\t").writerows(rows)
             logging.info(f"Benchmark results saved to {self.output_path}")
         except Exception as e:
             logging.error(f"Failed to save benchmark: {e}")
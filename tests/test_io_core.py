@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so splace._io_core builds its SynGenes instance
+# against the clean TMPDIR. requests.get is stubbed to serve a tiny database.
+SCRIPT = textwrap.dedent(
+    """
+    import io
+    import sys
+
+    import pandas as pd
+    import requests
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame({"Full Name": ["cytochrome c oxidase subunit I"], "Short Name": ["COI"]}).to_excel(writer, sheet_name="Mitochondrial", index=False)
+        pd.DataFrame({"Full Name": ["maturase K"], "Short Name": ["matK"]}).to_excel(writer, sheet_name="Chloroplast", index=False)
+
+    class FakeResponse:
+        ok = True
+        def iter_content(self, chunk_size):
+            yield buffer.getvalue()
+
+    requests.get = lambda *args, **kwargs: FakeResponse()
+
+    sys.path.insert(0, sys.argv[1])
+    from splace._io_core import fix_gene_name
+
+    print(fix_gene_name("maturase K", "cp"))
+    print(fix_gene_name("cytochrome c oxidase subunit I", "mt"))
+    """
+)
+
+
+class SynGenesDatabaseLocationTest(unittest.TestCase):
+    def test_database_downloaded_where_fix_gene_name_reads_it(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, tempfile.TemporaryDirectory() as work_dir:
+            env = dict(os.environ, TMPDIR=tmp_dir)
+            result = subprocess.run(
+                [sys.executable, "-c", SCRIPT, REPO_ROOT],
+                cwd=work_dir,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=120,
+            )
+
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(result.stdout.split()[-2:], ["matK", "COI"])
+            self.assertTrue(os.path.isfile(os.path.join(tmp_dir, "SynGenes", "SynGenes.xlsx")))
+            self.assertFalse(os.path.exists(os.path.join(work_dir, "SynGenes")))
+
+
+if __name__ == "__main__":
+    unittest.main()
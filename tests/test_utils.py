@@ -0,0 +1,77 @@
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from splace.utils import gather_bounded
+
+# Workers are spawned, so the script needs a main guard; each task makes a
+# worker import SynGenes, which prints a banner on import.
+POOL_SCRIPT = textwrap.dedent(
+    """
+    import pkgutil
+    import sys
+
+    sys.path.insert(0, sys.argv[1])
+    from splace.utils import get_process_executor
+
+    if __name__ == "__main__":
+        executor = get_process_executor()
+        futures = [executor.submit(pkgutil.resolve_name, "SynGenes.SynGenes:TerminalColors.End") for _ in range(4)]
+        print(len([future.result() for future in futures]), "tasks done")
+    """
+)
+
+
+class GatherBoundedTest(unittest.TestCase):
+    def test_results_in_input_order_with_exceptions_in_place(self):
+        async def worker(item):
+            await asyncio.sleep(0.01 * (5 - item))
+            if item == 2:
+                raise ValueError(item)
+            return item * 10
+
+        results = asyncio.run(gather_bounded([0, 1, 2, 3, 4], worker, 2))
+
+        self.assertEqual(results[:2] + results[3:], [0, 10, 30, 40])
+        self.assertIsInstance(results[2], ValueError)
+
+    def test_sys_exit_in_worker_is_raised_by_caller(self):
+        started = []
+
+        async def worker(item):
+            started.append(item)
+            if item == 0:
+                sys.exit(1)
+            await asyncio.sleep(10)
+
+        # No "Task exception was never retrieved" report, only the exit
+        with self.assertNoLogs("asyncio", level="ERROR"), self.assertRaises(SystemExit) as context:
+            asyncio.run(gather_bounded([0, 1, 2, 3], worker, 2))
+
+        self.assertEqual(context.exception.code, 1)
+        self.assertNotIn(2, started)
+        self.assertNotIn(3, started)
+
+
+
+class ProcessExecutorTest(unittest.TestCase):
+    def test_worker_imports_print_nothing(self):
+        result = subprocess.run(
+            [sys.executable, "-c", POOL_SCRIPT, REPO_ROOT],
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "4 tasks done\n")
+
+
+if __name__ == "__main__":
+    unittest.main()